@@ -1,65 +1,85 @@
 import sys
 import os
 import struct
+import io
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+try:
+    from PIL import Image  # Optional: native BCn decoder and PNG writer
+except ImportError:
+    Image = None
+
+# Block layouts: DXT1 is two RGB565 endpoints + 32-bit indices,
+# DXT5 prepends a 64-bit alpha block (two endpoints + 48-bit indices)
+DXT1_BLOCK = struct.Struct('<HHI')
+DXT5_BLOCK = struct.Struct('<QHHI')
+
+# BIMAGE header fields: width (0x0E) and height (0x12) as big-endian int16, format (0x23)
+BIMAGE_HEADER = struct.Struct('>14xH2xH15xB')
+
+# RGB565 -> RGB888 for every possible endpoint, rounded to nearest
+RGB565_TO_RGB888 = [
+    ((((c >> 11) & 0x1F) * 527 + 23) >> 6,
+     (((c >> 5) & 0x3F) * 259 + 33) >> 6,
+     ((c & 0x1F) * 527 + 23) >> 6)
+    for c in range(65536)
+]
+
+# Texel indices for one 4-texel block row: a byte holds four 2-bit colour
+# indices, 12 bits hold four 3-bit alpha indices
+COLOR_ROW_INDICES = [(v & 0x3, (v >> 2) & 0x3, (v >> 4) & 0x3, (v >> 6) & 0x3) for v in range(256)]
+ALPHA_ROW_INDICES = [(v & 0x7, (v >> 3) & 0x7, (v >> 6) & 0x7, (v >> 9) & 0x7) for v in range(4096)]
+
+# Single-byte bytes objects, used to pack DXT5 alpha values next to RGB texels
+BYTE_VALUES = [bytes((v,)) for v in range(256)]
+
+# Upper bound on compressed bytes buffered before an IDAT chunk is written
+PNG_IDAT_CHUNK_SIZE = 64 * 1024
+
 def decompress_dxt1(data, width, height):
     """Decompress DXT1/BC1 format"""
     pixels = bytearray(width * height * 4)
     
     block_width = (width + 3) // 4
     block_height = (height + 3) // 4
+    row_stride = width * 4
     
-    for by in range(block_height):
-        for bx in range(block_width):
-            block_offset = (by * block_width + bx) * 8
-            if block_offset + 8 > len(data):
-                continue
-                
-            c0 = struct.unpack('<H', data[block_offset:block_offset+2])[0]
-            c1 = struct.unpack('<H', data[block_offset+2:block_offset+4])[0]
-            indices = struct.unpack('<I', data[block_offset+4:block_offset+8])[0]
-            
-            # Convert RGB565 to RGB888
-            colors = []
-            for c in [c0, c1]:
-                r = ((c >> 11) & 0x1F) * 255 // 31
-                g = ((c >> 5) & 0x3F) * 255 // 63
-                b = (c & 0x1F) * 255 // 31
-                colors.append((r, g, b, 255))
-            
-            # Interpolate colors
-            if c0 > c1:
-                colors.append((
-                    (2 * colors[0][0] + colors[1][0]) // 3,
-                    (2 * colors[0][1] + colors[1][1]) // 3,
-                    (2 * colors[0][2] + colors[1][2]) // 3,
-                    255
-                ))
-                colors.append((
-                    (colors[0][0] + 2 * colors[1][0]) // 3,
-                    (colors[0][1] + 2 * colors[1][1]) // 3,
-                    (colors[0][2] + 2 * colors[1][2]) // 3,
-                    255
-                ))
-            else:
-                colors.append((
-                    (colors[0][0] + colors[1][0]) // 2,
-                    (colors[0][1] + colors[1][1]) // 2,
-                    (colors[0][2] + colors[1][2]) // 2,
-                    255
-                ))
-                colors.append((0, 0, 0, 0))
-            
-            # Write pixels
-            for py in range(4):
-                for px in range(4):
-                    x = bx * 4 + px
-                    y = by * 4 + py
-                    if x < width and y < height:
-                        index = (indices >> ((py * 4 + px) * 2)) & 0x3
-                        pixel_offset = (y * width + x) * 4
-                        pixels[pixel_offset:pixel_offset+4] = colors[index]
+    # Unpack every complete block in one pass, missing trailing blocks stay blank
+    block_count = min(block_width * block_height, len(data) // 8)
+    for i, (c0, c1, indices) in enumerate(DXT1_BLOCK.iter_unpack(memoryview(data)[:block_count * 8])):
+        by, bx = divmod(i, block_width)
+        rows = min(4, height - by * 4)
+        
+        # Convert RGB565 to RGB888
+        r0, g0, b0 = RGB565_TO_RGB888[c0]
+        r1, g1, b1 = RGB565_TO_RGB888[c1]
+        
+        # Build the palette as packed RGBA texels
+        if c0 > c1:
+            palette = (
+                bytes((r0, g0, b0, 255)),
+                bytes((r1, g1, b1, 255)),
+                bytes(((2 * r0 + r1) // 3, (2 * g0 + g1) // 3, (2 * b0 + b1) // 3, 255)),
+                bytes(((r0 + 2 * r1) // 3, (g0 + 2 * g1) // 3, (b0 + 2 * b1) // 3, 255))
+            )
+        else:
+            palette = (
+                bytes((r0, g0, b0, 255)),
+                bytes((r1, g1, b1, 255)),
+                bytes(((r0 + r1) // 2, (g0 + g1) // 2, (b0 + b1) // 2, 255)),
+                b'\x00\x00\x00\x00'
+            )
+        
+        # Write pixels one 4-texel row at a time, clipped to the image edge
+        span = min(4, width - bx * 4) * 4
+        pixel_offset = (by * 4 * width + bx * 4) * 4
+        for py in range(rows):
+            i0, i1, i2, i3 = COLOR_ROW_INDICES[(indices >> (py * 8)) & 0xFF]
+            texels = palette[i0] + palette[i1] + palette[i2] + palette[i3]
+            pixels[pixel_offset:pixel_offset+span] = texels[:span]
+            pixel_offset += row_stride
     
     return bytes(pixels)
 
@@ -69,61 +89,51 @@ def decompress_dxt5(data, width, height):
     
     block_width = (width + 3) // 4
     block_height = (height + 3) // 4
+    row_stride = width * 4
     
-    for by in range(block_height):
-        for bx in range(block_width):
-            block_offset = (by * block_width + bx) * 16
-            if block_offset + 16 > len(data):
-                continue
-            
-            # Alpha block
-            a0 = data[block_offset]
-            a1 = data[block_offset + 1]
-            alpha_indices = struct.unpack('<Q', data[block_offset:block_offset+8])[0] >> 16
-            
-            alphas = [a0, a1]
-            if a0 > a1:
-                for i in range(1, 7):
-                    alphas.append(((7 - i) * a0 + i * a1) // 7)
-            else:
-                for i in range(1, 5):
-                    alphas.append(((5 - i) * a0 + i * a1) // 5)
-                alphas.extend([0, 255])
-            
-            # Color block
-            c0 = struct.unpack('<H', data[block_offset+8:block_offset+10])[0]
-            c1 = struct.unpack('<H', data[block_offset+10:block_offset+12])[0]
-            indices = struct.unpack('<I', data[block_offset+12:block_offset+16])[0]
-            
-            colors = []
-            for c in [c0, c1]:
-                r = ((c >> 11) & 0x1F) * 255 // 31
-                g = ((c >> 5) & 0x3F) * 255 // 63
-                b = (c & 0x1F) * 255 // 31
-                colors.append((r, g, b))
-            
-            colors.append((
-                (2 * colors[0][0] + colors[1][0]) // 3,
-                (2 * colors[0][1] + colors[1][1]) // 3,
-                (2 * colors[0][2] + colors[1][2]) // 3
-            ))
-            colors.append((
-                (colors[0][0] + 2 * colors[1][0]) // 3,
-                (colors[0][1] + 2 * colors[1][1]) // 3,
-                (colors[0][2] + 2 * colors[1][2]) // 3
-            ))
-            
-            for py in range(4):
-                for px in range(4):
-                    x = bx * 4 + px
-                    y = by * 4 + py
-                    if x < width and y < height:
-                        color_idx = (indices >> ((py * 4 + px) * 2)) & 0x3
-                        alpha_idx = (alpha_indices >> ((py * 4 + px) * 3)) & 0x7
-                        
-                        pixel_offset = (y * width + x) * 4
-                        pixels[pixel_offset:pixel_offset+3] = colors[color_idx]
-                        pixels[pixel_offset+3] = alphas[alpha_idx]
+    # Unpack every complete block in one pass, missing trailing blocks stay blank
+    block_count = min(block_width * block_height, len(data) // 16)
+    for i, (alpha_block, c0, c1, indices) in enumerate(DXT5_BLOCK.iter_unpack(memoryview(data)[:block_count * 16])):
+        by, bx = divmod(i, block_width)
+        rows = min(4, height - by * 4)
+        
+        # Alpha block
+        a0 = alpha_block & 0xFF
+        a1 = (alpha_block >> 8) & 0xFF
+        alpha_indices = alpha_block >> 16
+        
+        alphas = [a0, a1]
+        if a0 > a1:
+            for j in range(1, 7):
+                alphas.append(((7 - j) * a0 + j * a1) // 7)
+        else:
+            for j in range(1, 5):
+                alphas.append(((5 - j) * a0 + j * a1) // 5)
+            alphas.extend([0, 255])
+        alphas = [BYTE_VALUES[a] for a in alphas]
+        
+        # Color block
+        r0, g0, b0 = RGB565_TO_RGB888[c0]
+        r1, g1, b1 = RGB565_TO_RGB888[c1]
+        
+        # Packed RGB texels, joined with the packed alphas per row below
+        colors = (
+            bytes((r0, g0, b0)),
+            bytes((r1, g1, b1)),
+            bytes(((2 * r0 + r1) // 3, (2 * g0 + g1) // 3, (2 * b0 + b1) // 3)),
+            bytes(((r0 + 2 * r1) // 3, (g0 + 2 * g1) // 3, (b0 + 2 * b1) // 3))
+        )
+        
+        # Write pixels one 4-texel row at a time, clipped to the image edge
+        span = min(4, width - bx * 4) * 4
+        pixel_offset = (by * 4 * width + bx * 4) * 4
+        for py in range(rows):
+            i0, i1, i2, i3 = COLOR_ROW_INDICES[(indices >> (py * 8)) & 0xFF]
+            j0, j1, j2, j3 = ALPHA_ROW_INDICES[(alpha_indices >> (py * 12)) & 0xFFF]
+            texels = b''.join((colors[i0], alphas[j0], colors[i1], alphas[j1],
+                               colors[i2], alphas[j2], colors[i3], alphas[j3]))
+            pixels[pixel_offset:pixel_offset+span] = texels[:span]
+            pixel_offset += row_stride
     
     return bytes(pixels)
 
@@ -134,61 +144,62 @@ def write_png(filename, width, height, rgba_data):
     def pack_be(fmt, *args):
         return struct.pack('>' + fmt, *args)
     
-    # PNG signature
-    png_data = b'\x89PNG\r\n\x1a\n'
-    
-    # IHDR chunk
-    ihdr = pack_be('IIBBBBB', width, height, 8, 6, 0, 0, 0)
-    png_data += pack_be('I', 13) + b'IHDR' + ihdr
-    png_data += pack_be('I', zlib.crc32(b'IHDR' + ihdr) & 0xffffffff)
-    
-    # IDAT chunk
-    raw = b''
-    for y in range(height):
-        raw += b'\x00'  # Filter type
-        raw += rgba_data[y * width * 4:(y + 1) * width * 4]
-    
-    compressed = zlib.compress(raw, 9)
-    png_data += pack_be('I', len(compressed)) + b'IDAT' + compressed
-    png_data += pack_be('I', zlib.crc32(b'IDAT' + compressed) & 0xffffffff)
-    
-    # IEND chunk
-    png_data += pack_be('I', 0) + b'IEND'
-    png_data += pack_be('I', zlib.crc32(b'IEND') & 0xffffffff)
+    def write_chunk(f, chunk_type, payload):
+        f.write(pack_be('I', len(payload)) + chunk_type)
+        f.write(payload)
+        f.write(pack_be('I', zlib.crc32(payload, zlib.crc32(chunk_type)) & 0xffffffff))
     
     with open(filename, 'wb') as f:
-        f.write(png_data)
+        # PNG signature
+        f.write(b'\x89PNG\r\n\x1a\n')
+        
+        # IHDR chunk
+        write_chunk(f, b'IHDR', pack_be('IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        
+        # IDAT chunks: scanlines are deflated as they are produced and written out in
+        # PNG_IDAT_CHUNK_SIZE pieces, so the image is never held uncompressed twice
+        compressor = zlib.compressobj(6)
+        stride = width * 4
+        rgba_view = memoryview(rgba_data)
+        scanline = bytearray(stride + 1)  # Filter type 0 in the first byte
+        pending = []
+        pending_size = 0
+        for y in range(height):
+            scanline[1:] = rgba_view[y * stride:(y + 1) * stride]
+            compressed = compressor.compress(scanline)
+            if compressed:
+                pending.append(compressed)
+                pending_size += len(compressed)
+                if pending_size >= PNG_IDAT_CHUNK_SIZE:
+                    write_chunk(f, b'IDAT', b''.join(pending))
+                    pending = []
+                    pending_size = 0
+        pending.append(compressor.flush())
+        write_chunk(f, b'IDAT', b''.join(pending))
+        
+        # IEND chunk
+        write_chunk(f, b'IEND', b'')
 
 def convert_bimage(input_path):
     """Convert BIMAGE to PNG"""
     try:
         with open(input_path, 'rb') as f:
-            # Read width (0x0E, big-endian int16)
-            f.seek(0x0E)
-            width = struct.unpack('>H', f.read(2))[0]
-            
-            # Read height (0x12, big-endian int16)
-            f.seek(0x12)
-            height = struct.unpack('>H', f.read(2))[0]
-            
-            # Read format (0x23)
-            f.seek(0x23)
-            fmt = f.read(1)[0]
-            
-            # Read image data (from 0x48)
-            f.seek(0x48)
+            # Read the 0x48-byte header, then image data (from 0x48)
+            header = f.read(0x48)
             image_data = f.read()
         
+        width, height, fmt = BIMAGE_HEADER.unpack_from(header)
+        
         print(f"Processing: {os.path.basename(input_path)}")
         print(f"Dimensions: {width}x{height}")
         
-        # Decompress based on format
+        # Pick the decoder based on format
         if fmt == 0x0B:
             print("Format: BC3/DXT5")
-            rgba = decompress_dxt5(image_data, width, height)
+            decompress, bcn, block_size = decompress_dxt5, 3, 16
         elif fmt == 0x0A:
             print("Format: BC1/DXT1")
-            rgba = decompress_dxt1(image_data, width, height)
+            decompress, bcn, block_size = decompress_dxt1, 1, 8
         else:
             print(f"Unknown format: 0x{fmt:02X}")
             return False
@@ -196,8 +207,17 @@ def convert_bimage(input_path):
         # Generate output filename
         output_path = str(Path(input_path).with_suffix('.png'))
         
-        # Write PNG
-        write_png(output_path, width, height, rgba)
+        # Pillow needs every block present and can't save an empty image,
+        # so truncated or zero-sized textures go through the Python decoder
+        blocks = ((width + 3) // 4) * ((height + 3) // 4)
+        if Image is not None and width and height and len(image_data) >= blocks * block_size:
+            # Pillow expands endpoints by bit replication, RGB565_TO_RGB888 rounds to nearest,
+            # so the two paths can differ by 1 per channel; neither is meant to match the other
+            img = Image.frombytes('RGBA', (width, height), image_data, 'bcn', bcn)
+            img.save(output_path, optimize=False, compress_level=6)
+        else:
+            rgba = decompress(image_data, width, height)
+            write_png(output_path, width, height, rgba)
         print(f"Saved: {os.path.basename(output_path)}\n")
         return True
         
@@ -205,6 +225,13 @@ def convert_bimage(input_path):
         print(f"Error processing {input_path}: {e}\n")
         return False
 
+def convert_bimage_captured(input_path):
+    """Convert BIMAGE to PNG in a worker, returning the result and its output for the parent to print"""
+    log = io.StringIO()
+    with redirect_stdout(log):
+        success = convert_bimage(input_path)
+    return success, log.getvalue()
+
 def main():
     print("=" * 50)
     print("BIMAGE to PNG Converter")
@@ -216,12 +243,20 @@ def main():
         return
     
     files = sys.argv[1:]
-    success_count = 0
+    input_files = [file_path for file_path in files if os.path.isfile(file_path)]
     
-    for file_path in files:
-        if os.path.isfile(file_path):
-            if convert_bimage(file_path):
-                success_count += 1
+    # Files are independent and CPU-bound, so convert batches in parallel processes
+    if len(input_files) > 1:
+        sys.stdout.flush()  # Keep forked workers from re-emitting the banner
+        results = []
+        with ProcessPoolExecutor() as executor:
+            # Print each file's output whole and in order, so blocks from different workers don't interleave
+            for success, log in executor.map(convert_bimage_captured, input_files):
+                print(log, end='')
+                results.append(success)
+    else:
+        results = [convert_bimage(file_path) for file_path in input_files]
+    success_count = sum(results)
     
     print("=" * 50)
     print(f"Completed: {success_count}/{len(files)} files converted successfully")
@@ -18,29 +18,26 @@ ROTATE_X_MINUS_90 = True   # Rotate model -90 degrees on X axis
 FLIP_UV_MAPS = True        # Flip UV coordinates (1.0 - V)
 FLIP_FACE_ORIENTATION = True  # Reverse face winding order
 SHADE_SMOOTH = True        # Generate smooth vertex normals (like Blender's Shade Smooth)
+OBJ_PRECISION = 4          # Decimal places written for OBJ positions, normals and UVs
+VERBOSE = False            # Print [DEBUG] details (first vertices and faces)
 # ==========================================
 
+# Precompiled binary layouts
+UINT16_BE = struct.Struct('>H')
+VERTEX_ENTRY = struct.Struct(f'>5f{VERTEX_STRIDE - 20}x')  # XYZ + UV floats, padding up to the stride
+FACE_INDICES = struct.Struct('>3H')
+
 def read_int16_be(data, offset):
     """Read big-endian 16-bit integer"""
-    return struct.unpack('>H', data[offset:offset+2])[0]
-
-def read_float_be(data, offset):
-    """Read big-endian 32-bit float"""
-    return struct.unpack('>f', data[offset:offset+4])[0]
+    return UINT16_BE.unpack_from(data, offset)[0]
 
 def rotate_x_minus_90(vertices):
     """Rotate vertices -90 degrees around X axis"""
-    rotated = []
-    for x, y, z in vertices:
-        # Rotation matrix for -90 degrees around X axis
-        # [1,  0,  0]   [x]
-        # [0,  0,  1] * [y]
-        # [0, -1,  0]   [z]
-        new_x = x
-        new_y = z
-        new_z = -y
-        rotated.append((new_x, new_y, new_z))
-    return rotated
+    # Rotation matrix for -90 degrees around X axis
+    # [1,  0,  0]   [x]
+    # [0,  0,  1] * [y]
+    # [0, -1,  0]   [z]
+    return [(x, z, -y) for x, y, z in vertices]
 
 def flip_uvs(uvs):
     """Flip UV coordinates (invert V)"""
@@ -48,45 +45,48 @@ def flip_uvs(uvs):
 
 def flip_faces(faces):
     """Reverse face winding order"""
-    return [(f[0], f[2], f[1]) for f in faces]
+    return [(a, c, b) for a, b, c in faces]
 
 def calculate_vertex_normals(vertices, faces):
     """Calculate smooth vertex normals (like Blender's Shade Smooth)"""
-    # Initialize normal accumulator for each vertex
-    normals = [[0.0, 0.0, 0.0] for _ in vertices]
+    # Initialize normal accumulators (one list per axis) for each vertex
+    normals_x = [0.0] * len(vertices)
+    normals_y = [0.0] * len(vertices)
+    normals_z = [0.0] * len(vertices)
     
     # For each face, calculate face normal and add to vertex normals
-    for face in faces:
+    for i0, i1, i2 in faces:
         # Get the three vertices of the triangle
-        v0 = vertices[face[0]]
-        v1 = vertices[face[1]]
-        v2 = vertices[face[2]]
+        x0, y0, z0 = vertices[i0]
+        x1, y1, z1 = vertices[i1]
+        x2, y2, z2 = vertices[i2]
         
         # Calculate two edge vectors
-        edge1 = (v1[0] - v0[0], v1[1] - v0[1], v1[2] - v0[2])
-        edge2 = (v2[0] - v0[0], v2[1] - v0[1], v2[2] - v0[2])
+        e1x, e1y, e1z = x1 - x0, y1 - y0, z1 - z0
+        e2x, e2y, e2z = x2 - x0, y2 - y0, z2 - z0
         
         # Calculate face normal using cross product
-        nx = edge1[1] * edge2[2] - edge1[2] * edge2[1]
-        ny = edge1[2] * edge2[0] - edge1[0] * edge2[2]
-        nz = edge1[0] * edge2[1] - edge1[1] * edge2[0]
+        nx = e1y * e2z - e1z * e2y
+        ny = e1z * e2x - e1x * e2z
+        nz = e1x * e2y - e1y * e2x
         
         # Add this face normal to all three vertices
-        for idx in face:
-            normals[idx][0] += nx
-            normals[idx][1] += ny
-            normals[idx][2] += nz
+        normals_x[i0] += nx
+        normals_y[i0] += ny
+        normals_z[i0] += nz
+        normals_x[i1] += nx
+        normals_y[i1] += ny
+        normals_z[i1] += nz
+        normals_x[i2] += nx
+        normals_y[i2] += ny
+        normals_z[i2] += nz
     
     # Normalize all vertex normals
     normalized_normals = []
-    for normal in normals:
-        length = math.sqrt(normal[0]**2 + normal[1]**2 + normal[2]**2)
+    for nx, ny, nz in zip(normals_x, normals_y, normals_z):
+        length = math.sqrt(nx * nx + ny * ny + nz * nz)
         if length > 0.0:
-            normalized_normals.append((
-                normal[0] / length,
-                normal[1] / length,
-                normal[2] / length
-            ))
+            normalized_normals.append((nx / length, ny / length, nz / length))
         else:
             normalized_normals.append((0.0, 0.0, 1.0))  # Default normal
     
@@ -113,31 +113,23 @@ def apply_transforms(model_data):
         model_data['normals'] = None
     
     return model_data
-    """Read big-endian 16-bit integer"""
-    return struct.unpack('>H', data[offset:offset+2])[0]
 
-def read_float_be(data, offset):
-    """Read big-endian 32-bit float"""
-    return struct.unpack('>f', data[offset:offset+4])[0]
-
-def find_buffer_marker(data, start_offset=0):
-    """Find the buffer marker in the data"""
+def find_buffer_markers(data, start_offset=0):
+    """Find every buffer marker offset in the data in a single scan"""
+    offsets = []
     index = data.find(BUFFER_MARKER, start_offset)
-    return index
+    while index != -1:
+        offsets.append(index)
+        index = data.find(BUFFER_MARKER, index + 1)
+    return offsets
 
-def extract_model(data, start_search_offset, part_number=1):
+def extract_model(data, marker_offset, part_number=1):
     """Extract model data from .bmd6model file data"""
     
     print(f"\n{'='*60}")
     print(f"Extracting Part {part_number}")
     print(f"{'='*60}\n")
     
-    # Find buffer marker from the given offset
-    marker_offset = find_buffer_marker(data, start_search_offset)
-    if marker_offset == -1:
-        print(f"[INFO] No more buffer markers found (searched from offset 0x{start_search_offset:X})")
-        return None, -1
-    
     print(f"[INFO] Buffer marker found at offset: 0x{marker_offset:X} ({marker_offset})")
     
     # Move past the marker
@@ -163,28 +155,17 @@ def extract_model(data, start_search_offset, part_number=1):
     print(f"[INFO] First vertex offset: 0x{offset:X} ({offset})")
     
     # Extract vertices AND UVs together (interleaved data)
-    vertices = []
-    uvs = []
-    print(f"\n[DEBUG] First 5 vertices and UV coords (interleaved):")
-    for i in range(vertex_count):
-        # Read XYZ (3 floats = 12 bytes)
-        x = read_float_be(data, offset)
-        y = read_float_be(data, offset + 4)
-        z = read_float_be(data, offset + 8)
-        vertices.append((x, y, z))
-        
-        # Read UV (2 floats = 8 bytes) - immediately after XYZ
-        u = read_float_be(data, offset + 12)
-        v = read_float_be(data, offset + 16)
-        uvs.append((u, v))
-        
-        if i < 5:
-            print(f"  Entry{i+1} at 0x{offset:X}:")
+    offset += vertex_count * VERTEX_STRIDE
+    entries = list(VERTEX_ENTRY.iter_unpack(data[vertex_data_start:offset]))
+    vertices = [entry[:3] for entry in entries]
+    uvs = [entry[3:] for entry in entries]
+    
+    if VERBOSE:
+        print(f"\n[DEBUG] First 5 vertices and UV coords (interleaved):")
+        for i, (x, y, z, u, v) in enumerate(entries[:5]):
+            print(f"  Entry{i+1} at 0x{vertex_data_start + i * VERTEX_STRIDE:X}:")
             print(f"    Vertex: ({x:.6f}, {y:.6f}, {z:.6f})")
             print(f"    UV: ({u:.6f}, {v:.6f})")
-        
-        # Move to next entry using full stride
-        offset += VERTEX_STRIDE
     
     print(f"[INFO] Extracted {len(vertices)} vertices")
     print(f"[INFO] Extracted {len(uvs)} UV coordinates")
@@ -194,20 +175,14 @@ def extract_model(data, start_search_offset, part_number=1):
     face_data_start = offset
     print(f"[INFO] Face data offset: 0x{offset:X} ({offset})")
     
-    faces = []
-    print(f"\n[DEBUG] First 5 faces (as triangles):")
+    # Assuming triangles (3 shorts = 6 bytes per face), unpacked in one pass
+    offset += face_count * 6
+    faces = list(FACE_INDICES.iter_unpack(data[face_data_start:offset]))
     
-    # Assuming triangles (3 indices per face)
-    for i in range(face_count):
-        idx1 = read_int16_be(data, offset)
-        idx2 = read_int16_be(data, offset + 2)
-        idx3 = read_int16_be(data, offset + 4)
-        faces.append((idx1, idx2, idx3))
-        
-        if i < 5:
-            print(f"  F{i+1}: ({idx1}, {idx2}, {idx3}) at offset 0x{offset:X}")
-        
-        offset += 6  # 3 shorts = 6 bytes
+    if VERBOSE:
+        print(f"\n[DEBUG] First 5 faces (as triangles):")
+        for i, (idx1, idx2, idx3) in enumerate(faces[:5]):
+            print(f"  F{i+1}: ({idx1}, {idx2}, {idx3}) at offset 0x{face_data_start + i * 6:X}")
     
     print(f"[INFO] Extracted {len(faces)} faces")
     
@@ -227,44 +202,47 @@ def write_obj(model_data, output_file):
     
     print(f"\n[INFO] Writing to {output_file}...")
     
-    with open(output_file, 'w') as f:
-        f.write(f"# Extracted from .bmd6model\n")
-        f.write(f"# Vertices: {model_data['vertex_count']}\n")
-        f.write(f"# Faces: {model_data['face_count']}\n")
-        
-        if SHADE_SMOOTH:
-            f.write(f"# Smooth shading: ON\n")
-        
-        f.write("\n")
-        
-        # Write vertices
-        for v in model_data['vertices']:
-            f.write(f"v {v[0]:.6f} {v[1]:.6f} {v[2]:.6f}\n")
-        
-        # Write vertex normals if smooth shading is enabled
-        if model_data.get('normals'):
-            f.write("\n")
-            for n in model_data['normals']:
-                f.write(f"vn {n[0]:.6f} {n[1]:.6f} {n[2]:.6f}\n")
-        
-        # Write UV coordinates
-        f.write("\n")
-        for uv in model_data['uvs']:
-            f.write(f"vt {uv[0]:.6f} {uv[1]:.6f}\n")
-        
-        f.write("\n")
-        
-        # Write faces with normals if available
-        if model_data.get('normals'):
-            # Format: f v/vt/vn v/vt/vn v/vt/vn
-            for face in model_data['faces']:
-                f.write(f"f {face[0]+1}/{face[0]+1}/{face[0]+1} "
-                       f"{face[1]+1}/{face[1]+1}/{face[1]+1} "
-                       f"{face[2]+1}/{face[2]+1}/{face[2]+1}\n")
-        else:
-            # Format: f v/vt v/vt v/vt (no normals)
-            for face in model_data['faces']:
-                f.write(f"f {face[0]+1}/{face[0]+1} {face[1]+1}/{face[1]+1} {face[2]+1}/{face[2]+1}\n")
+    coord = f"%.{OBJ_PRECISION}f"
+    vertex_line = f"v {coord} {coord} {coord}\n"
+    normal_line = f"vn {coord} {coord} {coord}\n"
+    uv_line = f"vt {coord} {coord}\n"
+    
+    # Build the whole file in memory and write it as bytes in one call
+    out = []
+    out.append(f"# Extracted from .bmd6model\n")
+    out.append(f"# Vertices: {model_data['vertex_count']}\n")
+    out.append(f"# Faces: {model_data['face_count']}\n")
+    
+    if SHADE_SMOOTH:
+        out.append(f"# Smooth shading: ON\n")
+    
+    out.append("\n")
+    
+    # Write vertices
+    out.extend(vertex_line % v for v in model_data['vertices'])
+    
+    # Write vertex normals if smooth shading is enabled
+    if model_data.get('normals'):
+        out.append("\n")
+        out.extend(normal_line % n for n in model_data['normals'])
+    
+    # Write UV coordinates
+    out.append("\n")
+    out.extend(uv_line % uv for uv in model_data['uvs'])
+    
+    out.append("\n")
+    
+    # Write faces with normals if available
+    if model_data.get('normals'):
+        # Format: f v/vt/vn v/vt/vn v/vt/vn
+        face_line = "f {0}/{0}/{0} {1}/{1}/{1} {2}/{2}/{2}\n"
+    else:
+        # Format: f v/vt v/vt v/vt (no normals)
+        face_line = "f {0}/{0} {1}/{1} {2}/{2}\n"
+    out.extend(face_line.format(a + 1, b + 1, c + 1) for a, b, c in model_data['faces'])
+    
+    with open(output_file, 'wb') as f:
+        f.write(''.join(out).encode('ascii'))
     
     print(f"[SUCCESS] OBJ file written successfully!")
 
@@ -307,18 +285,22 @@ def main():
     print(f"  Flip Face Orientation: {FLIP_FACE_ORIENTATION}")
     print(f"  Shade Smooth: {SHADE_SMOOTH}")
     
+    # Locate every buffer marker up front, then parse through a zero-copy view
+    marker_offsets = find_buffer_markers(file_data, HEADER_SIZE)  # Start after header
+    file_view = memoryview(file_data)
+    
     # Extract all models in the file
     part_number = 1
-    search_offset = HEADER_SIZE  # Start after header
+    search_offset = HEADER_SIZE
     total_extracted = 0
     
-    while True:
-        # Extract model data
-        model_data, next_offset = extract_model(file_data, search_offset, part_number)
+    for marker_offset in marker_offsets:
+        # Skip markers that fall inside the previous model's data
+        if marker_offset < search_offset:
+            continue
         
-        if model_data is None:
-            # No more models found
-            break
+        # Extract model data
+        model_data, next_offset = extract_model(file_view, marker_offset, part_number)
         
         # Apply transforms
         model_data = apply_transforms(model_data)
@@ -333,6 +315,8 @@ def main():
         part_number += 1
         search_offset = next_offset  # Continue searching from where we left off
     
+    print(f"\n[INFO] No more buffer markers found (searched from offset 0x{search_offset:X})")
+    
     print(f"\n{'='*60}")
     print(f"Conversion complete!")
     print(f"Total models extracted: {total_extracted}")
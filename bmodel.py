@@ -2,6 +2,10 @@ import struct
 import sys
 import os
 import math
+import mmap
+import io
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
 
 # ============= CONFIGURATION =============
 # These are adjustable parameters for file structure
@@ -18,25 +22,21 @@ ROTATE_X_MINUS_90 = True   # Rotate model -90 degrees on X axis
 FLIP_UV_MAPS = True        # Flip UV coordinates (1.0 - V)
 FLIP_FACE_ORIENTATION = True  # Reverse face winding order
 SHADE_SMOOTH = True        # Generate smooth vertex normals (like Blender's Shade Smooth)
+OBJ_PRECISION = 4          # Decimal places written for OBJ positions, normals and UVs
+VERBOSE = False            # Print [DEBUG] details (first vertices/faces, strip terminators)
 # ==========================================
 
+# Precompiled binary layouts
+UINT16_BE = struct.Struct('>H')
+VERTEX_ENTRY = struct.Struct(f'>5f{VERTEX_STRIDE - 20}x')  # XYZ + UV floats, padding up to the stride
+
 def read_int16_be(data, offset):
     """Read big-endian 16-bit integer"""
-    return struct.unpack('>H', data[offset:offset+2])[0]
-
-def read_float_be(data, offset):
-    """Read big-endian 32-bit float"""
-    return struct.unpack('>f', data[offset:offset+4])[0]
+    return UINT16_BE.unpack_from(data, offset)[0]
 
 def rotate_x_minus_90(vertices):
     """Rotate vertices -90 degrees around X axis"""
-    rotated = []
-    for x, y, z in vertices:
-        new_x = x
-        new_y = z
-        new_z = -y
-        rotated.append((new_x, new_y, new_z))
-    return rotated
+    return [(x, z, -y) for x, y, z in vertices]
 
 def flip_uvs(uvs):
     """Flip UV coordinates (invert V)"""
@@ -44,38 +44,41 @@ def flip_uvs(uvs):
 
 def flip_faces(faces):
     """Reverse face winding order"""
-    return [(f[0], f[2], f[1]) for f in faces]
+    return [(a, c, b) for a, b, c in faces]
 
 def calculate_vertex_normals(vertices, faces):
     """Calculate smooth vertex normals (like Blender's Shade Smooth)"""
-    normals = [[0.0, 0.0, 0.0] for _ in vertices]
-    
-    for face in faces:
-        v0 = vertices[face[0]]
-        v1 = vertices[face[1]]
-        v2 = vertices[face[2]]
+    normals_x = [0.0] * len(vertices)
+    normals_y = [0.0] * len(vertices)
+    normals_z = [0.0] * len(vertices)
+    
+    for i0, i1, i2 in faces:
+        x0, y0, z0 = vertices[i0]
+        x1, y1, z1 = vertices[i1]
+        x2, y2, z2 = vertices[i2]
         
-        edge1 = (v1[0] - v0[0], v1[1] - v0[1], v1[2] - v0[2])
-        edge2 = (v2[0] - v0[0], v2[1] - v0[1], v2[2] - v0[2])
+        e1x, e1y, e1z = x1 - x0, y1 - y0, z1 - z0
+        e2x, e2y, e2z = x2 - x0, y2 - y0, z2 - z0
         
-        nx = edge1[1] * edge2[2] - edge1[2] * edge2[1]
-        ny = edge1[2] * edge2[0] - edge1[0] * edge2[2]
-        nz = edge1[0] * edge2[1] - edge1[1] * edge2[0]
+        nx = e1y * e2z - e1z * e2y
+        ny = e1z * e2x - e1x * e2z
+        nz = e1x * e2y - e1y * e2x
         
-        for idx in face:
-            normals[idx][0] += nx
-            normals[idx][1] += ny
-            normals[idx][2] += nz
+        normals_x[i0] += nx
+        normals_y[i0] += ny
+        normals_z[i0] += nz
+        normals_x[i1] += nx
+        normals_y[i1] += ny
+        normals_z[i1] += nz
+        normals_x[i2] += nx
+        normals_y[i2] += ny
+        normals_z[i2] += nz
     
     normalized_normals = []
-    for normal in normals:
-        length = math.sqrt(normal[0]**2 + normal[1]**2 + normal[2]**2)
+    for nx, ny, nz in zip(normals_x, normals_y, normals_z):
+        length = math.sqrt(nx * nx + ny * ny + nz * nz)
         if length > 0.0:
-            normalized_normals.append((
-                normal[0] / length,
-                normal[1] / length,
-                normal[2] / length
-            ))
+            normalized_normals.append((nx / length, ny / length, nz / length))
         else:
             normalized_normals.append((0.0, 0.0, 1.0))
     
@@ -103,74 +106,93 @@ def apply_transforms(model_data):
     
     return model_data
 
-def find_buffer_marker(data, start_offset=0):
-    """Find the buffer marker in the data"""
+def find_buffer_markers(data, start_offset=0):
+    """Find every buffer marker offset in the data in a single scan"""
+    offsets = []
     index = data.find(BUFFER_MARKER, start_offset)
-    return index
+    while index != -1:
+        offsets.append(index)
+        index = data.find(BUFFER_MARKER, index + 1)
+    return offsets
+
+def triangulate_strip(strip_indices):
+    """Convert one triangle strip into individual triangles"""
+    triangles = list(zip(strip_indices, strip_indices[1:], strip_indices[2:]))
+    # Odd triangles are reversed to maintain consistent winding
+    triangles[1::2] = [(a, c, b) for a, b, c in triangles[1::2]]
+    return triangles
 
 def extract_triangle_strip_faces(data, offset, face_count):
     """Extract faces from triangle strip format with 0xFFFF terminators (TStripFF)"""
     faces = []
     strip_indices = []
-    bytes_read = 0
     
-    print(f"\n[DEBUG] Reading triangle strip data (TStripFF format):")
+    if VERBOSE:
+        print(f"\n[DEBUG] Reading triangle strip data (TStripFF format):")
     
-    while bytes_read < face_count * 2:  # face_count might represent total indices
-        idx = read_int16_be(data, offset)
-        
-        if idx == 0xFFFF:
-            # Strip terminator - convert current strip to triangles
-            if len(strip_indices) >= 3:
-                print(f"  Strip terminator at byte {bytes_read}: {len(strip_indices)} indices -> {len(strip_indices)-2} triangles")
-                
-                # Convert strip to triangles
-                for i in range(len(strip_indices) - 2):
-                    if i % 2 == 0:
-                        # Even triangle: normal order
-                        faces.append((strip_indices[i], strip_indices[i+1], strip_indices[i+2]))
-                    else:
-                        # Odd triangle: reversed order (maintains consistent winding)
-                        faces.append((strip_indices[i], strip_indices[i+2], strip_indices[i+1]))
-                
-                strip_indices = []  # Reset for next strip
-            
-            offset += 2
-            bytes_read += 2
-            continue
+    # face_count might represent total indices, unpack them all at once
+    indices = struct.unpack(f'>{face_count}H', data[offset:offset + face_count * 2])
+    
+    # Walk the 0xFFFF terminators with tuple.index instead of testing every index
+    start = 0
+    while True:
+        try:
+            end = indices.index(0xFFFF, start)
+        except ValueError:
+            break
         
-        strip_indices.append(idx)
-        offset += 2
-        bytes_read += 2
+        # Strips shorter than 3 indices are not closed and carry over into the next one
+        strip_indices.extend(indices[start:end])
+        if len(strip_indices) >= 3:
+            if VERBOSE:
+                print(f"  Strip terminator at byte {end * 2}: {len(strip_indices)} indices -> {len(strip_indices)-2} triangles")
+            faces.extend(triangulate_strip(strip_indices))
+            strip_indices = []  # Reset for next strip
         
-        # Safety check
-        if bytes_read > face_count * 4:  # Prevent infinite loop
-            print(f"[WARNING] Exceeded expected face data size, stopping")
-            break
+        start = end + 1
     
     # Handle any remaining strip
+    strip_indices.extend(indices[start:])
     if len(strip_indices) >= 3:
-        print(f"  Final strip: {len(strip_indices)} indices -> {len(strip_indices)-2} triangles")
-        for i in range(len(strip_indices) - 2):
-            if i % 2 == 0:
-                faces.append((strip_indices[i], strip_indices[i+1], strip_indices[i+2]))
-            else:
-                faces.append((strip_indices[i], strip_indices[i+2], strip_indices[i+1]))
-    
-    return faces, offset
+        if VERBOSE:
+            print(f"  Final strip: {len(strip_indices)} indices -> {len(strip_indices)-2} triangles")
+        faces.extend(triangulate_strip(strip_indices))
+    
+    return faces
+
+def index_parts(data, start_offset=HEADER_SIZE):
+    """Locate every model part from the header counts, without parsing vertex or face data"""
+    marker_offsets = []
+    search_offset = start_offset
+    
+    for marker_offset in find_buffer_markers(data, start_offset):
+        # Skip markers that fall inside the previous part's data
+        if marker_offset < search_offset:
+            continue
+        
+        # A stray marker in trailing data has no room for its counts, stop before it
+        offset = marker_offset + len(BUFFER_MARKER) + SKIP_TO_VERTEX_COUNT
+        if offset + 2 + SKIP_TO_FACE_COUNT + 2 > len(data):
+            break
+        marker_offsets.append(marker_offset)
+        
+        vertex_count = read_int16_be(data, offset)
+        offset += 2 + SKIP_TO_FACE_COUNT
+        face_count = read_int16_be(data, offset)
+        offset += 2 + SKIP_TO_FIRST_VERTEX
+        
+        # The part ends after its vertex entries and strip indices
+        search_offset = offset + vertex_count * VERTEX_STRIDE + face_count * 2
+    
+    return marker_offsets, search_offset
 
-def extract_model(data, start_search_offset, part_number=1):
+def extract_model(data, marker_offset, part_number=1):
     """Extract model data from .bmd6model file data"""
     
     print(f"\n{'='*60}")
     print(f"Extracting Part {part_number}")
     print(f"{'='*60}\n")
     
-    marker_offset = find_buffer_marker(data, start_search_offset)
-    if marker_offset == -1:
-        print(f"[INFO] No more buffer markers found (searched from offset 0x{start_search_offset:X})")
-        return None, -1
-    
     print(f"[INFO] Buffer marker found at offset: 0x{marker_offset:X} ({marker_offset})")
     
     offset = marker_offset + len(BUFFER_MARKER)
@@ -191,41 +213,31 @@ def extract_model(data, start_search_offset, part_number=1):
     vertex_data_start = offset
     print(f"[INFO] First vertex offset: 0x{offset:X} ({offset})")
     
-    vertices = []
-    uvs = []
-    print(f"\n[DEBUG] First 5 vertices and UV coords (interleaved):")
-    for i in range(vertex_count):
-        x = read_float_be(data, offset)
-        y = read_float_be(data, offset + 4)
-        z = read_float_be(data, offset + 8)
-        vertices.append((x, y, z))
-        
-        u = read_float_be(data, offset + 12)
-        v = read_float_be(data, offset + 16)
-        uvs.append((u, v))
-        
-        if i < 5:
-            print(f"  Entry{i+1} at 0x{offset:X}:")
+    offset += vertex_count * VERTEX_STRIDE
+    entries = list(VERTEX_ENTRY.iter_unpack(data[vertex_data_start:offset]))
+    vertices = [entry[:3] for entry in entries]
+    uvs = [entry[3:] for entry in entries]
+    
+    if VERBOSE:
+        print(f"\n[DEBUG] First 5 vertices and UV coords (interleaved):")
+        for i, (x, y, z, u, v) in enumerate(entries[:5]):
+            print(f"  Entry{i+1} at 0x{vertex_data_start + i * VERTEX_STRIDE:X}:")
             print(f"    Vertex: ({x:.6f}, {y:.6f}, {z:.6f})")
             print(f"    UV: ({u:.6f}, {v:.6f})")
-        
-        offset += VERTEX_STRIDE
     
     print(f"[INFO] Extracted {len(vertices)} vertices")
     print(f"[INFO] Extracted {len(uvs)} UV coordinates")
     
-    face_data_start = offset
     print(f"[INFO] Face data offset: 0x{offset:X} ({offset})")
     
     # Extract faces using triangle strip format
-    faces, offset = extract_triangle_strip_faces(data, offset, face_count)
+    faces = extract_triangle_strip_faces(data, offset, face_count)
     
     print(f"[INFO] Extracted {len(faces)} triangular faces from strip data")
-    print(f"\n[DEBUG] First 5 faces:")
-    for i, face in enumerate(faces[:5]):
-        print(f"  F{i+1}: ({face[0]}, {face[1]}, {face[2]})")
-    
-    next_search_offset = offset
+    if VERBOSE:
+        print(f"\n[DEBUG] First 5 faces:")
+        for i, face in enumerate(faces[:5]):
+            print(f"  F{i+1}: ({face[0]}, {face[1]}, {face[2]})")
     
     return {
         'vertices': vertices,
@@ -233,49 +245,78 @@ def extract_model(data, start_search_offset, part_number=1):
         'faces': faces,
         'vertex_count': vertex_count,
         'face_count': len(faces)
-    }, next_search_offset
+    }
 
 def write_obj(model_data, output_file):
     """Write model data to .obj file"""
     
     print(f"\n[INFO] Writing to {output_file}...")
     
-    with open(output_file, 'w') as f:
-        f.write(f"# Extracted from .bmd6model\n")
-        f.write(f"# Vertices: {model_data['vertex_count']}\n")
-        f.write(f"# Faces: {model_data['face_count']}\n")
-        f.write(f"# Format: Triangle Strip with 0xFFFF terminators (TStripFF)\n")
-        
-        if SHADE_SMOOTH:
-            f.write(f"# Smooth shading: ON\n")
-        
-        f.write("\n")
-        
-        for v in model_data['vertices']:
-            f.write(f"v {v[0]:.6f} {v[1]:.6f} {v[2]:.6f}\n")
-        
-        if model_data.get('normals'):
-            f.write("\n")
-            for n in model_data['normals']:
-                f.write(f"vn {n[0]:.6f} {n[1]:.6f} {n[2]:.6f}\n")
-        
-        f.write("\n")
-        for uv in model_data['uvs']:
-            f.write(f"vt {uv[0]:.6f} {uv[1]:.6f}\n")
-        
-        f.write("\n")
-        
-        if model_data.get('normals'):
-            for face in model_data['faces']:
-                f.write(f"f {face[0]+1}/{face[0]+1}/{face[0]+1} "
-                       f"{face[1]+1}/{face[1]+1}/{face[1]+1} "
-                       f"{face[2]+1}/{face[2]+1}/{face[2]+1}\n")
-        else:
-            for face in model_data['faces']:
-                f.write(f"f {face[0]+1}/{face[0]+1} {face[1]+1}/{face[1]+1} {face[2]+1}/{face[2]+1}\n")
+    coord = f"%.{OBJ_PRECISION}f"
+    vertex_line = f"v {coord} {coord} {coord}\n"
+    normal_line = f"vn {coord} {coord} {coord}\n"
+    uv_line = f"vt {coord} {coord}\n"
+    
+    # Build the whole file in memory and write it as bytes in one call
+    out = []
+    out.append(f"# Extracted from .bmd6model\n")
+    out.append(f"# Vertices: {model_data['vertex_count']}\n")
+    out.append(f"# Faces: {model_data['face_count']}\n")
+    out.append(f"# Format: Triangle Strip with 0xFFFF terminators (TStripFF)\n")
+    
+    if SHADE_SMOOTH:
+        out.append(f"# Smooth shading: ON\n")
+    
+    out.append("\n")
+    
+    out.extend(vertex_line % v for v in model_data['vertices'])
+    
+    if model_data.get('normals'):
+        out.append("\n")
+        out.extend(normal_line % n for n in model_data['normals'])
+    
+    out.append("\n")
+    out.extend(uv_line % uv for uv in model_data['uvs'])
+    
+    out.append("\n")
+    
+    if model_data.get('normals'):
+        face_line = "f {0}/{0}/{0} {1}/{1}/{1} {2}/{2}/{2}\n"
+    else:
+        face_line = "f {0}/{0} {1}/{1} {2}/{2}\n"
+    out.extend(face_line.format(a + 1, b + 1, c + 1) for a, b, c in model_data['faces'])
+    
+    with open(output_file, 'wb') as f:
+        f.write(''.join(out).encode('ascii'))
     
     print(f"[SUCCESS] OBJ file written successfully!")
 
+# Contents of the model file being converted, loaded once per process
+model_file_data = None
+
+def load_model_file(input_file):
+    """Map the model file into this process (also used as the worker initializer)"""
+    global model_file_data
+    with open(input_file, 'rb') as f:
+        # mmap can't map an empty file
+        if os.fstat(f.fileno()).st_size:
+            model_file_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            model_file_data = f.read()
+
+def process_part(marker_offset, part_number, output_file):
+    """Extract, transform and write a single model part"""
+    model_data = extract_model(model_file_data, marker_offset, part_number)
+    model_data = apply_transforms(model_data)
+    write_obj(model_data, output_file)
+
+def process_part_captured(marker_offset, part_number, output_file):
+    """Convert a single model part in a worker, returning its output for the parent to print"""
+    log = io.StringIO()
+    with redirect_stdout(log):
+        process_part(marker_offset, part_number, output_file)
+    return log.getvalue()
+
 def main():
     print("\n" + "="*60)
     print("BMD6Model to OBJ Converter (TStripFF Format)")
@@ -300,10 +341,9 @@ def main():
     os.makedirs(output_folder, exist_ok=True)
     print(f"\n[INFO] Output folder: {output_folder}")
     
-    with open(input_file, 'rb') as f:
-        file_data = f.read()
+    load_model_file(input_file)
     
-    print(f"[INFO] File size: {len(file_data)} bytes")
+    print(f"[INFO] File size: {len(model_file_data)} bytes")
     
     print(f"\n[TRANSFORM OPTIONS]")
     print(f"  Rotate X -90°: {ROTATE_X_MINUS_90}")
@@ -311,25 +351,28 @@ def main():
     print(f"  Flip Face Orientation: {FLIP_FACE_ORIENTATION}")
     print(f"  Shade Smooth: {SHADE_SMOOTH}")
     
-    part_number = 1
-    search_offset = HEADER_SIZE
-    total_extracted = 0
+    marker_offsets, search_offset = index_parts(model_file_data)
+    part_numbers = range(1, len(marker_offsets) + 1)
+    output_files = [os.path.join(output_folder, f"{model_name}_part{part_number}.obj")
+                    for part_number in part_numbers]
+    
+    # Parts are independent once located, so convert them in parallel processes
+    if len(marker_offsets) > 1:
+        sys.stdout.flush()  # Keep forked workers from re-emitting buffered output
+        with ProcessPoolExecutor(initializer=load_model_file, initargs=(input_file,)) as executor:
+            # Print each part's output whole and in order, so blocks from different workers don't interleave
+            for log in executor.map(process_part_captured, marker_offsets, part_numbers, output_files):
+                print(log, end='')
+    else:
+        for marker_offset, part_number, output_file in zip(marker_offsets, part_numbers, output_files):
+            process_part(marker_offset, part_number, output_file)
     
-    while True:
-        model_data, next_offset = extract_model(file_data, search_offset, part_number)
-        
-        if model_data is None:
-            break
-        
-        model_data = apply_transforms(model_data)
-        
-        output_file = os.path.join(output_folder, f"{model_name}_part{part_number}.obj")
-        
-        write_obj(model_data, output_file)
-        
-        total_extracted += 1
-        part_number += 1
-        search_offset = next_offset
+    # Workers map the file themselves, so the parent's mapping can be released now
+    if isinstance(model_file_data, mmap.mmap):
+        model_file_data.close()
+    total_extracted = len(marker_offsets)
+    
+    print(f"\n[INFO] No more buffer markers found (searched from offset 0x{search_offset:X})")
     
     print(f"\n{'='*60}")
     print(f"Conversion complete!")
@@ -17,17 +17,21 @@ FRA_STREAMED = "french.streamed"
 ITA_STREAMED = "italian.streamed"
 SPA_STREAMED = "spanish.streamed"
 
-def read_string(f, length):
-    """Read a string of specified length from file"""
-    return f.read(length).decode('utf-8', errors='ignore').rstrip('\x00')
+# Precompiled 4-byte integer layouts
+UINT32_LE = struct.Struct('<I')
+UINT32_BE = struct.Struct('>I')
 
-def read_long_le(f):
-    """Read a 4-byte little-endian long"""
-    return struct.unpack('<I', f.read(4))[0]
+def read_string(data, pos, length):
+    """Read a string of specified length at pos"""
+    return data[pos:pos + length].decode('utf-8', errors='ignore').rstrip('\x00')
 
-def read_long_be(f):
-    """Read a 4-byte big-endian long"""
-    return struct.unpack('>I', f.read(4))[0]
+def read_long_le(data, pos):
+    """Read a 4-byte little-endian long at pos"""
+    return UINT32_LE.unpack_from(data, pos)[0]
+
+def read_long_be(data, pos):
+    """Read a 4-byte big-endian long at pos"""
+    return UINT32_BE.unpack_from(data, pos)[0]
 
 def extract_sound(source_file, output_name, offset, size):
     """Extract sound data from source file"""
@@ -57,100 +61,100 @@ def main():
     
     print(f"Processing archive: {archive_file}")
     
+    # Read the whole archive once and walk it with a cursor
     with open(archive_file, 'rb') as f:
-        # Go to offset 0x24 (36 bytes)
-        f.seek(0x24)
+        data = f.read()
+    
+    # Go to offset 0x24 (36 bytes)
+    pos = 0x24
+    
+    # Read number of files (big-endian)
+    files = read_long_be(data, pos)
+    unk = read_long_be(data, pos + 4)
+    pos += 8
+    
+    print(f"Number of files: {files}")
+    
+    tmp = files - 1
+    
+    for i in range(files):
+        # Switch to little-endian for filenames
+        fnsize1 = read_long_le(data, pos)
+        fn1 = read_string(data, pos + 4, fnsize1)
+        pos += 4 + fnsize1
         
-        # Read number of files (big-endian)
-        files = read_long_be(f)
-        unk = read_long_be(f)
+        fnsize2 = read_long_le(data, pos)
+        fn2 = read_string(data, pos + 4, fnsize2)
+        pos += 4 + fnsize2
         
-        print(f"Number of files: {files}")
+        namesize = read_long_le(data, pos)
+        name = read_string(data, pos + 4, namesize)
+        pos += 4 + namesize
         
-        tmp = files - 1
+        # Switch back to big-endian for data
+        offset = read_long_be(data, pos)
+        size = read_long_be(data, pos + 4)
+        zsize = read_long_be(data, pos + 8)
+        unksize = read_long_be(data, pos + 12)
+        pos += 16
         
-        for i in range(files):
-            # Switch to little-endian for filenames
-            fnsize1 = read_long_le(f)
-            fn1 = read_string(f, fnsize1)
-            
-            fnsize2 = read_long_le(f)
-            fn2 = read_string(f, fnsize2)
-            
-            namesize = read_long_le(f)
-            name = read_string(f, namesize)
-            
-            # Switch back to big-endian for data
-            offset = read_long_be(f)
-            size = read_long_be(f)
-            zsize = read_long_be(f)
-            unksize = read_long_be(f)
-            
-            # Replace .wav with .ogg
-            fn2 = fn2.replace('.wav', '.ogg')
-            
-            if unksize == 1:
-                # Save current position and advance
-                pos = f.tell()
-                pos += 0x10
-                f.seek(pos)
-                
-                offset = read_long_be(f)
-                size = read_long_be(f)
-                
-                if MAIN_SOUND == 1:
-                    extract_sound(STREAMED_RESOURCES, fn2, offset, size)
+        # Replace .wav with .ogg
+        fn2 = fn2.replace('.wav', '.ogg')
+        
+        if unksize == 1:
+            # Skip ahead to the offset and size
+            pos += 0x10
+            offset = read_long_be(data, pos)
+            size = read_long_be(data, pos + 4)
+            pos += 8
             
-            elif unksize == 4:
-                # English sound
-                pos = f.tell()
-                pos += 0x10
-                f.seek(pos)
-                offset = read_long_be(f)
-                size = read_long_be(f)
-                if ENG_SOUND == 1:
-                    extract_sound(ENG_STREAMED, fn2, offset, size)
-                
-                # French sound
-                pos = f.tell()
-                pos += 0x10
-                f.seek(pos)
-                offset = read_long_be(f)
-                size = read_long_be(f)
-                if FRA_SOUND == 1:
-                    extract_sound(FRA_STREAMED, fn2, offset, size)
-                
-                # Italian sound
-                pos = f.tell()
-                pos += 0x10
-                f.seek(pos)
-                offset = read_long_be(f)
-                size = read_long_be(f)
-                if ITA_SOUND == 1:
-                    extract_sound(ITA_STREAMED, fn2, offset, size)
-                
-                # Spanish sound
-                pos = f.tell()
-                pos += 0x10
-                f.seek(pos)
-                offset = read_long_be(f)
-                size = read_long_be(f)
-                if SPA_SOUND == 1:
-                    extract_sound(SPA_STREAMED, fn2, offset, size)
+            if MAIN_SOUND == 1:
+                extract_sound(STREAMED_RESOURCES, fn2, offset, size)
+        
+        elif unksize == 4:
+            # English sound
+            pos += 0x10
+            offset = read_long_be(data, pos)
+            size = read_long_be(data, pos + 4)
+            pos += 8
+            if ENG_SOUND == 1:
+                extract_sound(ENG_STREAMED, fn2, offset, size)
             
-            else:
-                # Read unknown data
-                unksize_bytes = unksize * 0x18
-                unkdata = f.read(unksize_bytes)
+            # French sound
+            pos += 0x10
+            offset = read_long_be(data, pos)
+            size = read_long_be(data, pos + 4)
+            pos += 8
+            if FRA_SOUND == 1:
+                extract_sound(FRA_STREAMED, fn2, offset, size)
             
-            # Save position and advance
-            pos = f.tell()
-            pos += 0x5
-            f.seek(pos)
+            # Italian sound
+            pos += 0x10
+            offset = read_long_be(data, pos)
+            size = read_long_be(data, pos + 4)
+            pos += 8
+            if ITA_SOUND == 1:
+                extract_sound(ITA_STREAMED, fn2, offset, size)
             
-            # Read file number for next iteration (except last one)
-            if i != tmp:
-                filenumber = read_long_be(f)
+            # Spanish sound
+            pos += 0x10
+            offset = read_long_be(data, pos)
+            size = read_long_be(data, pos + 4)
+            pos += 8
+            if SPA_SOUND == 1:
+                extract_sound(SPA_STREAMED, fn2, offset, size)
+        
+        else:
+            # Skip unknown data
+            pos += unksize * 0x18
+        
+        # Advance past the entry trailer
+        pos += 0x5
+        
+        # Read file number for next iteration (except last one)
+        if i != tmp:
+            filenumber = read_long_be(data, pos)
+            pos += 4
     
     print("\nExtraction complete!")
 
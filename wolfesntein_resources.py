@@ -2,8 +2,102 @@ import os
 import sys
 import struct
 import zlib
+import mmap
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Precompiled index layouts: filename sizes are little endian, everything else big endian
+UINT32_LE = struct.Struct('<I')
+INDEX_HEADER = struct.Struct('>II')
+INDEX_ENTRY_INFO = struct.Struct('>IIII')
+
+def extract_entry(resources_data, offset, size, zsize, output_path):
+    """Extract one entry from the mapped resources file, returning its status symbol (None on error)"""
+    try:
+        # Read the data from the mapped resources file
+        if size == zsize:
+            # Uncompressed data
+            data = resources_data[offset:offset + size]
+            with open(output_path, 'wb') as out_file:
+                out_file.write(data)
+            status = "✓"
+        else:
+            # Compressed data - use raw DEFLATE (RFC 1951)
+            compressed_data = resources_data[offset:offset + zsize]
+            
+            # Try raw DEFLATE decompression (no headers)
+            try:
+                # Use wbits = -15 for raw DEFLATE without headers
+                try:
+                    data = zlib.decompress(compressed_data, wbits=-15)
+                except zlib.error:
+                    # A truncated stream still yields partial data through a decompressor
+                    decompressor = zlib.decompressobj(-15)
+                    data = decompressor.decompress(compressed_data)
+                    data += decompressor.flush()
+                
+                if len(data) == size:
+                    with open(output_path, 'wb') as out_file:
+                        out_file.write(data)
+                    status = "✓"
+                else:
+                    # Size mismatch but we'll use what we got
+                    with open(output_path, 'wb') as out_file:
+                        out_file.write(data)
+                    status = "⚠"
+                    
+            except zlib.error as e:
+                # Try alternative decompression methods
+                success = False
+                
+                # Method 2: Try with zlib header
+                try:
+                    data = zlib.decompress(compressed_data)
+                    if len(data) == size or abs(len(data) - size) < 100:
+                        with open(output_path, 'wb') as out_file:
+                            out_file.write(data)
+                        status = "✓"
+                        success = True
+                except:
+                    pass
+                
+                if not success:
+                    # Method 3: Try different window bits
+                    for wbits in [15, -zlib.MAX_WBITS]:
+                        try:
+                            decompressor = zlib.decompressobj(wbits)
+                            data = decompressor.decompress(compressed_data)
+                            data += decompressor.flush()
+                            if len(data) == size or abs(len(data) - size) < 100:
+                                with open(output_path, 'wb') as out_file:
+                                    out_file.write(data)
+                                status = "✓"
+                                success = True
+                                break
+                        except:
+                            continue
+                
+                if not success:
+                    # All methods failed
+                    with open(output_path, 'wb') as out_file:
+                        out_file.write(compressed_data)
+                    status = "✗"
+        
+        return status
+    
+    except Exception as e:
+        return None
+
+def output_key(output_path):
+    """Key that folds case and '..' so entries aliasing one file on disk are grouped together"""
+    return os.path.normcase(os.path.normpath(output_path)).casefold()
+
+def extract_entries(resources_data, entries):
+    """Extract entries that share an output path one after another, returning their statuses"""
+    return [extract_entry(resources_data, offset, size, zsize, output_path)
+            for _, _, offset, size, zsize, output_path in entries]
+
 def extract_resources(resources_file_path):
     """Extract .resources file using corresponding .index file"""
     
@@ -22,19 +116,27 @@ def extract_resources(resources_file_path):
     try:
         # Open both files
         with open(index_file_path, 'rb') as index_file, \
-             open(resources_file_path, 'rb') as resources_file:
+             open(resources_file_path, 'rb') as resources_file, \
+             ExitStack() as stack:
+            
+            # Map the resources file for the extract threads; mmap can't map an empty file
+            if os.fstat(resources_file.fileno()).st_size:
+                resources_data = stack.enter_context(
+                    mmap.mmap(resources_file.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                resources_data = resources_file.read()
             
-            # Read header from index file
-            index_file.seek(0x24)
+            # Read the whole index once and walk it with a cursor
+            index_data = index_file.read()
+            pos = 0x24
             
             # Read number of files (big endian)
-            files_data = index_file.read(4)
-            if len(files_data) < 4:
+            if len(index_data) - pos < 4:
                 print("Error: Index file too small")
                 return
             
-            files = struct.unpack('>I', files_data)[0]
-            unk = struct.unpack('>I', index_file.read(4))[0]
+            files, unk = INDEX_HEADER.unpack_from(index_data, pos)
+            pos += INDEX_HEADER.size
             
             print(f"Total files to extract: {files}\n")
             
@@ -46,143 +148,103 @@ def extract_resources(resources_file_path):
             compressed_count = 0
             failed_count = 0
             
+            # Read every entry from the index first; an index error is reported after the
+            # entries read before it, where the progress lines would have stopped
+            entries = []
+            index_error = None
             for i in range(files):
                 # Read filename parts (little endian)
-                fn_size1_data = index_file.read(4)
-                if len(fn_size1_data) < 4:
-                    print(f"Error reading FNsize1 for file {i}")
+                if len(index_data) - pos < 4:
+                    index_error = f"Error reading FNsize1 for file {i}"
                     break
                     
-                fn_size1 = struct.unpack('<I', fn_size1_data)[0]
-                fn1 = index_file.read(fn_size1).decode('utf-8', errors='replace')
+                # The first two filename parts are unused, so skip them undecoded
+                fn_size1 = UINT32_LE.unpack_from(index_data, pos)[0]
+                pos += 4 + fn_size1
                 
-                fn_size2_data = index_file.read(4)
-                if len(fn_size2_data) < 4:
-                    print(f"Error reading FNsize2 for file {i}")
+                if len(index_data) - pos < 4:
+                    index_error = f"Error reading FNsize2 for file {i}"
                     break
                     
-                fn_size2 = struct.unpack('<I', fn_size2_data)[0]
-                fn2 = index_file.read(fn_size2).decode('utf-8', errors='replace')
+                fn_size2 = UINT32_LE.unpack_from(index_data, pos)[0]
+                pos += 4 + fn_size2
                 
-                namesize_data = index_file.read(4)
-                if len(namesize_data) < 4:
-                    print(f"Error reading namesize for file {i}")
+                if len(index_data) - pos < 4:
+                    index_error = f"Error reading namesize for file {i}"
                     break
                     
-                namesize = struct.unpack('<I', namesize_data)[0]
-                name = index_file.read(namesize).decode('utf-8', errors='replace')
+                namesize = UINT32_LE.unpack_from(index_data, pos)[0]
+                pos += 4
+                name = index_data[pos:pos + namesize]
+                pos += namesize
                 
                 # Read file data info (big endian)
-                offset_data = index_file.read(4)
-                if len(offset_data) < 4:
-                    print(f"Error reading offset for file {i}")
+                if len(index_data) - pos < INDEX_ENTRY_INFO.size:
+                    index_error = f"Error reading offset for file {i}"
                     break
                     
-                offset = struct.unpack('>I', offset_data)[0]
-                size = struct.unpack('>I', index_file.read(4))[0]
-                zsize = struct.unpack('>I', index_file.read(4))[0]
-                unksize = struct.unpack('>I', index_file.read(4))[0]
+                offset, size, zsize, unksize = INDEX_ENTRY_INFO.unpack_from(index_data, pos)
+                pos += INDEX_ENTRY_INFO.size
                 
                 # Calculate and skip unkdata
                 unksize_calc = unksize * 0x18 + 5
-                index_file.read(int(unksize_calc))
+                pos += unksize_calc
                 
                 # Clean up filename and create proper directory structure
-                clean_name = name.strip().replace('\x00', '')
+                clean_name = name.decode('utf-8', errors='replace').strip().replace('\x00', '')
                 if not clean_name:
                     clean_name = f"file_{i:04d}"
                 
                 # Create full output path with proper directory structure
                 output_path = output_dir / clean_name
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                
                 try:
-                    # Read the data from resources file
-                    resources_file.seek(offset)
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                except OSError as e:
+                    index_error = f"Error creating directory for file {i}: {e}"
+                    break
+                
+                entries.append((i, clean_name, offset, size, zsize, output_path))
+                
+                # Read filenumber for all except last file
+                if i != tmp:
+                    if len(index_data) - pos < 4:
+                        index_error = f"Error reading filenumber after file {i}"
+                        break
+                    pos += 4
+            
+            # Entries sharing an output path go to one task in index order, so the last one still wins
+            path_entries = {}
+            for entry in entries:
+                path_entries.setdefault(output_key(entry[5]), []).append(entry)
+            
+            # Extract the entries in parallel; zlib and file writes release the GIL
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                futures = {path: executor.submit(extract_entries, resources_data, group)
+                           for path, group in path_entries.items()}
+                
+                path_statuses = {}
+                for i, clean_name, offset, size, zsize, output_path in entries:
+                    path = output_key(output_path)
+                    if path not in path_statuses:
+                        path_statuses[path] = iter(futures[path].result())
+                    status = next(path_statuses[path])
+                    if status is None:
+                        print(f"✗ [{i+1}/{files}]: {clean_name} [ERROR] [Failed to extract]")
+                        failed_count += 1
+                        continue
                     
-                    if size == zsize:
-                        # Uncompressed data
-                        data = resources_file.read(size)
-                        with open(output_path, 'wb') as out_file:
-                            out_file.write(data)
-                        status = "✓"
+                    if status != "✓":
+                        failed_count += 1
+                    elif size == zsize:
                         uncompressed_count += 1
                     else:
-                        # Compressed data - use raw DEFLATE (RFC 1951)
-                        compressed_data = resources_file.read(zsize)
-                        
-                        # Try raw DEFLATE decompression (no headers)
-                        try:
-                            # Use wbits = -15 for raw DEFLATE without headers
-                            decompressor = zlib.decompressobj(-15)
-                            data = decompressor.decompress(compressed_data)
-                            data += decompressor.flush()
-                            
-                            if len(data) == size:
-                                with open(output_path, 'wb') as out_file:
-                                    out_file.write(data)
-                                status = "✓"
-                                compressed_count += 1
-                            else:
-                                # Size mismatch but we'll use what we got
-                                with open(output_path, 'wb') as out_file:
-                                    out_file.write(data)
-                                status = "⚠"
-                                failed_count += 1
-                                
-                        except zlib.error as e:
-                            # Try alternative decompression methods
-                            success = False
-                            
-                            # Method 2: Try with zlib header
-                            try:
-                                data = zlib.decompress(compressed_data)
-                                if len(data) == size or abs(len(data) - size) < 100:
-                                    with open(output_path, 'wb') as out_file:
-                                        out_file.write(data)
-                                    status = "✓"
-                                    compressed_count += 1
-                                    success = True
-                            except:
-                                pass
-                            
-                            if not success:
-                                # Method 3: Try different window bits
-                                for wbits in [15, -zlib.MAX_WBITS]:
-                                    try:
-                                        decompressor = zlib.decompressobj(wbits)
-                                        data = decompressor.decompress(compressed_data)
-                                        data += decompressor.flush()
-                                        if len(data) == size or abs(len(data) - size) < 100:
-                                            with open(output_path, 'wb') as out_file:
-                                                out_file.write(data)
-                                            status = "✓"
-                                            compressed_count += 1
-                                            success = True
-                                            break
-                                    except:
-                                        continue
-                            
-                            if not success:
-                                # All methods failed
-                                with open(output_path, 'wb') as out_file:
-                                    out_file.write(compressed_data)
-                                status = "✗"
-                                failed_count += 1
+                        compressed_count += 1
                     
                     # Print progress in the requested format
                     print(f"{status} [{i+1}/{files}]: {clean_name} [EXTRACTED] [{zsize} => {size} bytes]")
-                
-                except Exception as e:
-                    print(f"✗ [{i+1}/{files}]: {clean_name} [ERROR] [Failed to extract]")
-                    failed_count += 1
-                
-                # Read filenumber for all except last file
-                if i != tmp:
-                    filenumber_data = index_file.read(4)
-                    if len(filenumber_data) < 4:
-                        print(f"Error reading filenumber after file {i}")
-                        break
+            
+            if index_error:
+                print(index_error)
             
             # Print final summary
             print("\n" + "=" * 70)